@@ -20,102 +20,74 @@ Supported formats:
 # ==============================================================================
 import streamlit as st
 import os
-import zipfile
-import docx
-import openpyxl
-from pptx import Presentation
-from bs4 import BeautifulSoup
-from markdownify import markdownify as md
 import io
+from converters import convert_file
+
+# Number of characters shown in the on-page preview
+PREVIEW_CHARS = 1000
 
 # ==============================================================================
-# 2. CORE CONVERSION FUNCTION (Adapted from Colab version)
+# 2. CACHED CONVERSION
 # ==============================================================================
 
-def convert_file_to_text(file_name, file_stream):
+@st.cache_data(max_entries=16, show_spinner=False)
+def convert_cached(file_name, data):
     """
-    A universal converter that processes a file stream and extracts text.
+    Converts an uploaded file's bytes to UTF-8 text, memoized across reruns.
 
-    It identifies the file type based on its extension and uses the appropriate
-    library to extract text content. For ZIP archives, it recursively processes
-    the files within.
+    Streamlit reruns the whole script on every widget interaction; caching on
+    the file name and content hash turns those repeat conversions into lookups.
 
     Args:
         file_name (str): The name of the file (e.g., 'document.docx').
-        file_stream (streamlit.UploadedFile or io.BytesIO): A byte stream of the file's content.
+        data (bytes): The file's raw content.
 
     Returns:
-        str: The extracted text content.
+        bytes: The extracted text content, encoded as UTF-8.
     """
-    # Get the file extension to determine the processing method
-    _, file_extension = os.path.splitext(file_name)
-    file_extension = file_extension.lower()
-    
-    extracted_text = ""
-
-    try:
-        # --- Handle Word documents ---
-        if file_extension == '.docx':
-            doc = docx.Document(file_stream)
-            full_text = [para.text for para in doc.paragraphs]
-            extracted_text = '\n'.join(full_text)
-
-        # --- Handle Excel spreadsheets ---
-        elif file_extension == '.xlsx':
-            workbook = openpyxl.load_workbook(file_stream)
-            full_text = []
-            for sheet in workbook.worksheets:
-                for row in sheet.iter_rows():
-                    row_text = '\t'.join([str(cell.value) for cell in row if cell.value is not None])
-                    full_text.append(row_text)
-            extracted_text = '\n'.join(full_text)
-
-        # --- Handle PowerPoint presentations ---
-        elif file_extension == '.pptx':
-            presentation = Presentation(file_stream)
-            full_text = []
-            for slide in presentation.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"):
-                        full_text.append(shape.text)
-            extracted_text = '\n---\n'.join(full_text)
-
-        # --- Handle HTML files (convert to Markdown) ---
-        elif file_extension == '.html':
-            html_content = file_stream.read().decode('utf-8', 'ignore')
-            # Use markdownify to convert HTML body to Markdown
-            extracted_text = md(html_content, heading_style="ATX")
-
-        # --- Handle ZIP archives ---
-        elif file_extension == '.zip':
-            full_text = []
-            with zipfile.ZipFile(file_stream, 'r') as zip_ref:
-                for name in zip_ref.namelist():
-                    if not name.startswith('__MACOSX/') and not name.endswith('/'):
-                        with zip_ref.open(name) as member_file:
-                            member_stream = io.BytesIO(member_file.read())
-                            st.info(f"  -> Processing '{name}' from ZIP archive...")
-                            member_text = convert_file_to_text(name, member_stream)
-                            full_text.append(f"--- Content from: {name} ---\n{member_text}")
-            extracted_text = "\n\n".join(full_text)
-            
-        # --- Handle plain text files ---
-        elif file_extension == '.txt':
-            extracted_text = file_stream.read().decode('utf-8', 'ignore')
-
-        else:
-            extracted_text = f"File type '{file_extension}' is not supported."
-
-    except Exception as e:
-        st.error(f"An error occurred while processing '{file_name}': {e}")
-        return ""
-
-    return extracted_text
+    return convert_file(file_name, io.BytesIO(data))
 
 # ==============================================================================
 # 3. STREAMLIT UI
 # ==============================================================================
 
+@st.fragment
+def render_output(converted_data, file_name):
+    """
+    Renders the preview and download button for a converted file.
+
+    As a fragment, interactions with these widgets rerun only this function,
+    not the upload, hashing and conversion steps in `main()`.
+
+    Args:
+        converted_data (bytes): The extracted text content, encoded as UTF-8.
+        file_name (str): The name of the uploaded file.
+    """
+    # --- Display Preview ---
+    # A character is at most 4 UTF-8 bytes, so this prefix always
+    # covers the first PREVIEW_CHARS characters
+    preview_text = converted_data[:4 * PREVIEW_CHARS].decode('utf-8', 'ignore')
+    st.subheader(f"Preview (First {PREVIEW_CHARS} characters)")
+    st.text_area(
+        "Preview",
+        preview_text[:PREVIEW_CHARS],
+        height=250,
+        label_visibility="collapsed"
+    )
+
+    # --- Download Button ---
+    base_name, _ = os.path.splitext(file_name)
+    download_filename = f"converted_{base_name}.txt"
+
+    st.download_button(
+        label="⬇️ Download Full Text",
+        data=converted_data,
+        file_name=download_filename,
+        mime='text/plain',
+        use_container_width=True
+    )
+
+
 def main():
     """Defines the Streamlit application's user interface and logic."""
     
@@ -141,33 +113,14 @@ def main():
     if uploaded_file is not None:
         file_name = uploaded_file.name
         
-        # Show a spinner while the file is being processed
+        # Show a spinner while the file is being processed. Only the encoded
+        # bytes are kept, and reruns on the same upload hit the cache.
         with st.spinner(f"Converting '{file_name}'..."):
-            converted_text = convert_file_to_text(file_name, uploaded_file)
+            converted_data = convert_cached(file_name, uploaded_file.getvalue())
         
-        if converted_text:
+        if converted_data:
             st.success("Conversion successful!")
-
-            # --- Display Preview ---
-            st.subheader("Preview (First 1000 characters)")
-            st.text_area(
-                "Preview",
-                converted_text[:1000],
-                height=250,
-                label_visibility="collapsed"
-            )
-
-            # --- Download Button ---
-            base_name, _ = os.path.splitext(file_name)
-            download_filename = f"converted_{base_name}.txt"
-            
-            st.download_button(
-                label="⬇️ Download Full Text",
-                data=converted_text.encode('utf-8'),
-                file_name=download_filename,
-                mime='text/plain',
-                use_container_width=True
-            )
+            render_output(converted_data, file_name)
 
 # ==============================================================================
 # 4. MAIN EXECUTION BLOCK
@@ -0,0 +1,576 @@
+# -*- coding: utf-8 -*-
+"""
+File-to-text conversion for the Universal File-to-Text Converter.
+
+Each supported format has a handler that appends the file's text, encoded as
+UTF-8, to a shared output buffer. ZIP archives are converted recursively.
+
+These functions live in their own importable module rather than in the
+Streamlit script: Streamlit re-executes the script as a fresh `__main__` on
+every rerun, which would leave process-pool workers unpicklable.
+"""
+
+# ==============================================================================
+# 1. IMPORTS
+# ==============================================================================
+import streamlit as st
+import codecs
+import contextlib
+import os
+import zipfile
+import openpyxl
+from bs4 import BeautifulSoup
+from markdownify import MarkdownConverter
+import io
+import multiprocessing
+import posixpath
+import struct
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import chain
+from operator import is_not
+from lxml import etree
+
+# Optional: selectolax's lexbor backend is a much faster C HTML5 parser, used
+# to prune HTML before BeautifulSoup builds its (slower) Python tree
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# lxml parses the Office XML parts directly, so it doubles as the C-backed
+# HTML parser for BeautifulSoup
+HTML_PARSER = "lxml"
+
+# HTML elements that never contribute to the Markdown output
+NON_CONTENT_TAGS = ['script', 'style']
+
+# Uploaded Office XML is untrusted: never expand entities or fetch external
+# resources while parsing it (the same stance python-docx/python-pptx take)
+XML_PARSER_OPTIONS = {'resolve_entities': False, 'no_network': True}
+
+# WordprocessingML element names used when streaming document.xml
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_BODY = W_NS + 'body'
+W_P = W_NS + 'p'
+W_R = W_NS + 'r'
+W_HYPERLINK = W_NS + 'hyperlink'
+W_T = W_NS + 't'
+W_TAB = W_NS + 'tab'
+W_BR = W_NS + 'br'
+W_CR = W_NS + 'cr'
+W_NO_BREAK_HYPHEN = W_NS + 'noBreakHyphen'
+W_PTAB = W_NS + 'ptab'
+W_TYPE = W_NS + 'type'
+
+# PresentationML / DrawingML element names used when streaming slide XML
+P_SLD_ID = '{http://schemas.openxmlformats.org/presentationml/2006/main}sldId'
+R_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+A_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+A_P = A_NS + 'p'
+A_R = A_NS + 'r'
+A_FLD = A_NS + 'fld'
+A_BR = A_NS + 'br'
+A_T = A_NS + 't'
+
+# Formats that are themselves ZIP containers. Their readers seek around the
+# central directory, so archive members of these types are read in place when
+# stored uncompressed and buffered in memory otherwise; everything else is
+# streamed straight from the archive.
+RANDOM_ACCESS_EXTENSIONS = {'.docx', '.xlsx', '.pptx', '.zip'}
+
+# Read buffer used when opening uncompressed members in place
+MEMBER_BUFFER_SIZE = 1 << 15
+
+# Archive members whose conversion is CPU-bound enough to be worth sending to
+# a worker process; everything else is streamed inline
+POOLED_EXTENSIONS = {'.docx', '.xlsx', '.pptx', '.html'}
+
+# Workers are started fresh rather than forked: forking the multi-threaded
+# Streamlit server copies its whole state, and its locks, into every worker
+POOL_CONTEXT = multiprocessing.get_context('spawn')
+
+# Starting spawned workers costs more than converting a few small documents,
+# so the pool is only used once the pooled members add up to this many bytes
+POOL_MIN_BYTES = 16 << 20
+
+# Plain text is decoded in chunks of this many bytes to bound peak memory
+TEXT_CHUNK_SIZE = 1 << 20
+
+# Zip-bomb guards: how deeply archives may nest, and how many uncompressed
+# bytes may be extracted from archives in total for a single upload
+MAX_ZIP_DEPTH = 3
+MAX_EXTRACTED_BYTES = 1 << 30
+
+# C-level predicate for dropping empty spreadsheet cells
+_is_not_none = partial(is_not, None)
+
+# ==============================================================================
+# 2. CORE CONVERSION FUNCTIONS (Adapted from Colab version)
+# ==============================================================================
+
+def _decode_utf8(data):
+    """Decodes UTF-8 bytes, dropping a leading byte-order mark and invalid sequences."""
+    if data.startswith(codecs.BOM_UTF8):
+        # Slice through a memoryview so large documents are not copied
+        return str(memoryview(data)[len(codecs.BOM_UTF8):], 'utf-8', 'ignore')
+    return data.decode('utf-8', 'ignore')
+
+
+def _write_joined(out, separator, parts):
+    """Appends each string in `parts` to `out` as UTF-8, with `separator` bytes in between."""
+    first = True
+    for part in parts:
+        if not first:
+            out += separator
+        out += part.encode('utf-8')
+        first = False
+
+
+def _row_text(row):
+    """Joins a row of cell values into a tab-separated line, skipping empty cells."""
+    return '\t'.join(map(str, filter(_is_not_none, row)))
+
+
+def _iter_docx_paragraphs(xml_file):
+    """
+    Streams the text of each top-level paragraph in a WordprocessingML part.
+
+    Mirrors python-docx's `Paragraph.text`: only runs that are direct children
+    of a body paragraph (or of a hyperlink directly inside it) contribute, with
+    tabs, line breaks and non-breaking hyphens rendered as '\t', '\n' and '-'.
+    Elements are discarded as soon as they have been read so memory stays flat
+    for large documents.
+    """
+    for _, paragraph in etree.iterparse(xml_file, tag=W_P, **XML_PARSER_OPTIONS):
+        body = paragraph.getparent()
+        if body.tag != W_BODY:
+            continue
+
+        parts = []
+        append = parts.append
+        for element in paragraph.iterchildren(W_R, W_HYPERLINK):
+            runs = element.iterchildren(W_R) if element.tag == W_HYPERLINK else (element,)
+            for run in runs:
+                for child in run.iterchildren(W_T, W_TAB, W_PTAB, W_BR, W_CR, W_NO_BREAK_HYPHEN):
+                    tag = child.tag
+                    if tag == W_T:
+                        append(child.text or '')
+                    elif tag == W_TAB or tag == W_PTAB:
+                        append('\t')
+                    elif tag == W_NO_BREAK_HYPHEN:
+                        append('-')
+                    elif tag == W_CR or child.get(W_TYPE, 'textWrapping') == 'textWrapping':
+                        append('\n')
+        yield ''.join(parts)
+
+        # Drop the paragraph and anything before it (e.g. tables) from the tree
+        paragraph.clear()
+        while paragraph.getprevious() is not None:
+            del body[0]
+
+
+def _pptx_slide_names(pptx_zip):
+    """Returns the archive paths of a presentation's slides in display order."""
+    parser = etree.XMLParser(**XML_PARSER_OPTIONS)
+    with pptx_zip.open('ppt/_rels/presentation.xml.rels') as rels_file:
+        rels = etree.parse(rels_file, parser).getroot()
+        targets = {rel.get('Id'): rel.get('Target') for rel in rels}
+    with pptx_zip.open('ppt/presentation.xml') as presentation_file:
+        slide_ids = etree.parse(presentation_file, parser).getroot().iter(P_SLD_ID)
+        return [
+            posixpath.normpath(posixpath.join('ppt', targets[slide_id.get(R_ID)])).lstrip('/')
+            for slide_id in slide_ids
+        ]
+
+
+def _iter_pptx_paragraphs(xml_file):
+    """Streams the text of each DrawingML paragraph in a slide part."""
+    for _, paragraph in etree.iterparse(xml_file, tag=A_P, **XML_PARSER_OPTIONS):
+        parts = []
+        append = parts.append
+        for child in paragraph.iterchildren(A_R, A_FLD, A_BR):
+            if child.tag == A_BR:
+                append('\n')
+            else:
+                append(child.findtext(A_T) or '')
+        yield ''.join(parts)
+        paragraph.clear()
+
+
+def _charge_office_parts(office_zip, limits):
+    """
+    Reserves the uncompressed size of an Office package's XML parts.
+
+    These are the parts the readers inflate, so a small document cannot
+    expand into gigabytes of XML unchecked.
+
+    Returns:
+        int: The number of bytes reserved.
+    """
+    reserved = 0
+    for info in office_zip.infolist():
+        if info.filename.lower().endswith(('.xml', '.rels')):
+            limits.charge(info)
+            reserved += info.file_size
+    return reserved
+
+
+def _handle_docx(file_stream, out, limits):
+    """Extracts paragraph text from a Word document."""
+    with zipfile.ZipFile(file_stream) as docx_zip:
+        _charge_office_parts(docx_zip, limits)
+        with docx_zip.open('word/document.xml') as xml_file:
+            _write_joined(out, b'\n', _iter_docx_paragraphs(xml_file))
+
+
+def _handle_xlsx(file_stream, out, limits):
+    """Extracts tab-separated cell values from every sheet of an Excel workbook."""
+    with zipfile.ZipFile(file_stream) as xlsx_zip:
+        _charge_office_parts(xlsx_zip, limits)
+    file_stream.seek(0)
+
+    # Read-only mode streams the sheet XML instead of building the
+    # full cell model; it keeps the archive open until closed
+    workbook = openpyxl.load_workbook(file_stream, read_only=True, data_only=True)
+    try:
+        rows = chain.from_iterable(
+            sheet.iter_rows(values_only=True) for sheet in workbook.worksheets
+        )
+        _write_joined(out, b'\n', map(_row_text, rows))
+    finally:
+        workbook.close()
+
+
+def _handle_pptx(file_stream, out, limits):
+    """Extracts slide text from a PowerPoint presentation."""
+    with zipfile.ZipFile(file_stream) as pptx_zip:
+        _charge_office_parts(pptx_zip, limits)
+        for index, slide_name in enumerate(_pptx_slide_names(pptx_zip)):
+            if index:
+                out += b'\n---\n'
+            with pptx_zip.open(slide_name) as xml_file:
+                _write_joined(out, b'\n', _iter_pptx_paragraphs(xml_file))
+
+
+def _handle_html(file_stream, out, limits):
+    """Converts an HTML page to Markdown."""
+    html_content = _decode_utf8(file_stream.read())
+    # Hand markdownify a pre-built tree of just the page body, so it does
+    # not re-parse the document or walk scripts and styles
+    tree = LexborHTMLParser(html_content) if LexborHTMLParser is not None else None
+    # Pages without a <body> (e.g. framesets) take the BeautifulSoup route
+    if tree is not None and tree.body is not None:
+        tree.strip_tags(NON_CONTENT_TAGS)
+        soup = BeautifulSoup(tree.body.html, HTML_PARSER)
+    else:
+        soup = BeautifulSoup(html_content, HTML_PARSER)
+        for tag in soup(['head', *NON_CONTENT_TAGS]):
+            tag.decompose()
+    converter = MarkdownConverter(heading_style="ATX")
+    out += converter.convert_soup(soup).encode('utf-8')
+
+
+class _ExtractionLimits:
+    """
+    Tracks the zip-bomb guards while one upload is being converted.
+
+    Attributes:
+        depth (int): How many archives enclose the file currently being processed.
+        remaining_bytes (int): Uncompressed bytes that may still be extracted.
+        errors (list or None): When set, error messages are collected here
+            instead of being shown with `st.error`. Pool workers use this, since
+            Streamlit calls made in another process never reach the page.
+    """
+
+    def __init__(self, remaining_bytes=MAX_EXTRACTED_BYTES, depth=0, errors=None):
+        self.remaining_bytes = remaining_bytes
+        self.depth = depth
+        self.errors = errors
+
+    def charge(self, info):
+        """Reserves a zip entry's uncompressed size, failing once the budget is spent."""
+        self.remaining_bytes -= info.file_size
+        if self.remaining_bytes < 0:
+            raise ValueError(
+                f"archive expands to more than {MAX_EXTRACTED_BYTES >> 20} MiB; "
+                "extraction stopped to guard against a zip bomb."
+            )
+
+
+class _StoredMember(io.RawIOBase):
+    """
+    Seekable, read-only view of an uncompressed archive member.
+
+    Reads go straight to the enclosing archive's file object, so stored Office
+    documents and nested archives can be opened in place rather than copied
+    into memory first.
+    """
+
+    def __init__(self, fileobj, start, size):
+        self._fileobj = fileobj
+        self._start = start
+        self._size = size
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._pos = min(max(offset, 0), self._size)
+        return self._pos
+
+    def readinto(self, buffer):
+        count = min(len(buffer), self._size - self._pos)
+        if count <= 0:
+            return 0
+        self._fileobj.seek(self._start + self._pos)
+        count = self._fileobj.readinto(memoryview(buffer)[:count])
+        self._pos += count
+        return count
+
+
+def _is_stored(info):
+    """Returns whether an archive member is kept as a contiguous, unencrypted byte range."""
+    return info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1
+
+
+def _open_member(zip_ref, info, member_extension):
+    """Opens an archive member as a stream suited to its format's reader."""
+    if member_extension not in RANDOM_ACCESS_EXTENSIONS:
+        return zip_ref.open(info)
+
+    if _is_stored(info):
+        fileobj = zip_ref.fp
+        fileobj.seek(info.header_offset)
+        header = fileobj.read(30)
+        if header[:4] == b'PK\x03\x04':
+            name_length, extra_length = struct.unpack('<HH', header[26:30])
+            start = info.header_offset + 30 + name_length + extra_length
+            member = _StoredMember(fileobj, start, info.file_size)
+            return io.BufferedReader(member, MEMBER_BUFFER_SIZE)
+
+    # Seeking backwards in a compressed member restarts decompression, so
+    # these are inflated into memory once instead
+    return io.BytesIO(zip_ref.read(info))
+
+
+def _pooled_member_limits(data, member_extension, limits):
+    """
+    Reserves a pooled member's share of the extraction budget.
+
+    Workers cannot draw on the shared budget, so the XML parts of an Office
+    document are charged here before it is submitted, and its worker may
+    spend exactly that much.
+    """
+    reserved = 0
+    if member_extension != '.html':
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as office_zip:
+                reserved = _charge_office_parts(office_zip, limits)
+        except (zipfile.BadZipFile, ValueError):
+            # Leave the worker no budget, so it reports the same error
+            pass
+    return _ExtractionLimits(reserved, limits.depth, errors=[])
+
+
+def _convert_member(member):
+    """
+    Process-pool worker that converts one archive member.
+
+    Args:
+        member (tuple): The member's `(name, data, limits)` triple.
+
+    Returns:
+        tuple: The extracted UTF-8 text and the error messages raised while
+            converting the member or anything nested inside it.
+    """
+    name, data, limits = member
+    out = bytearray()
+    convert_file_to_text(name, io.BytesIO(data), out, limits=limits)
+    return bytes(out), limits.errors
+
+
+def _convert_members(zip_ref, infos, out, limits):
+    """Converts the given archive members into `out`, in archive order."""
+    extensions = [_file_extension(info.filename) for info in infos]
+
+    # CPU-heavy members are independent, so fan them out across cores. Only
+    # the top-level archive does this, so worker pools are never nested.
+    pooled = [info for info, ext in zip(infos, extensions) if ext in POOLED_EXTENSIONS]
+    max_workers = min(len(pooled), os.cpu_count() or 1)
+    use_pool = (
+        max_workers > 1
+        and sum(info.file_size for info in pooled) >= POOL_MIN_BYTES
+        and limits.depth == 0
+        and multiprocessing.parent_process() is None
+    )
+
+    limits.depth += 1
+    try:
+        pool = ProcessPoolExecutor(max_workers, mp_context=POOL_CONTEXT) if use_pool else None
+        with pool or contextlib.nullcontext() as executor:
+            to_submit = iter(pooled)
+            pending = deque()
+            for index, (info, member_extension) in enumerate(zip(infos, extensions)):
+                # Keep at most max_workers pooled members in flight, so only
+                # that many are read into memory ahead of the output
+                while executor is not None and len(pending) < max_workers:
+                    next_info = next(to_submit, None)
+                    if next_info is None:
+                        break
+                    data = zip_ref.read(next_info)
+                    member_limits = _pooled_member_limits(
+                        data, _file_extension(next_info.filename), limits
+                    )
+                    pending.append(executor.submit(
+                        _convert_member, (next_info.filename, data, member_limits)
+                    ))
+
+                name = info.filename
+                if index:
+                    out += b"\n\n"
+                out += f"--- Content from: {name} ---\n".encode('utf-8')
+                if executor is not None and member_extension in POOLED_EXTENSIONS:
+                    member_data, errors = pending.popleft().result()
+                    for error in errors:
+                        st.error(error)
+                    out += member_data
+                else:
+                    with _open_member(zip_ref, info, member_extension) as member_stream:
+                        convert_file_to_text(name, member_stream, out, member_extension, limits)
+    finally:
+        limits.depth -= 1
+
+
+def _handle_zip(file_stream, out, limits):
+    """Recursively converts every supported file inside a ZIP archive."""
+    if limits.depth >= MAX_ZIP_DEPTH:
+        raise ValueError(f"archives nested more than {MAX_ZIP_DEPTH} levels deep are not processed.")
+
+    with zipfile.ZipFile(file_stream, 'r') as zip_ref:
+        infos = [
+            info for info in zip_ref.infolist()
+            if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+        ]
+        # Reserve the declared sizes of the members that will be extracted up
+        # front (ZipExtFile never yields more than that), so an oversized
+        # archive fails before any decompression. Unsupported members are
+        # never read, so they do not count. Stored nested archives are opened
+        # in place and only charge for their own members.
+        for info in infos:
+            member_extension = _file_extension(info.filename)
+            if member_extension == '.zip' and _is_stored(info):
+                continue
+            if member_extension in HANDLERS:
+                limits.charge(info)
+
+        _convert_members(zip_ref, infos, out, limits)
+
+    # Report the processed files once, in a single collapsed status box, rather
+    # than rendering a message per member. Nested archives are covered by the
+    # top-level entry.
+    if limits.depth == 0:
+        with st.status(f"Processed {len(infos)} files from ZIP archive.", state="complete"):
+            st.markdown("\n".join(f"- `{info.filename}`" for info in infos))
+
+
+def _handle_txt(file_stream, out, limits):
+    """Decodes a plain text file chunk by chunk, dropping a BOM and invalid UTF-8 sequences."""
+    decoder = codecs.getincrementaldecoder('utf-8')('ignore')
+    chunk = file_stream.read(TEXT_CHUNK_SIZE)
+    if chunk.startswith(codecs.BOM_UTF8):
+        chunk = chunk[len(codecs.BOM_UTF8):]
+    while chunk:
+        out += decoder.decode(chunk).encode('utf-8')
+        chunk = file_stream.read(TEXT_CHUNK_SIZE)
+    out += decoder.decode(b'', final=True).encode('utf-8')
+
+
+# Maps each supported file extension to the function that extracts its text
+HANDLERS = {
+    '.docx': _handle_docx,
+    '.xlsx': _handle_xlsx,
+    '.pptx': _handle_pptx,
+    '.html': _handle_html,
+    '.zip': _handle_zip,
+    '.txt': _handle_txt,
+}
+
+
+def _file_extension(file_name):
+    """Returns the lowercase extension of a file name (e.g., '.docx')."""
+    _, file_extension = os.path.splitext(file_name)
+    return file_extension.lower()
+
+
+def _convert(file_name, file_stream, out, file_extension=None, limits=None):
+    """Dispatches to the handler for the file's extension, letting errors propagate."""
+    # Get the file extension to determine the processing method
+    if file_extension is None:
+        file_extension = _file_extension(file_name)
+    if limits is None:
+        limits = _ExtractionLimits()
+
+    handler = HANDLERS.get(file_extension)
+    if handler is None:
+        out += f"File type '{file_extension}' is not supported.".encode('utf-8')
+        return
+    handler(file_stream, out, limits)
+
+
+def convert_file_to_text(file_name, file_stream, out, file_extension=None, limits=None):
+    """
+    A universal converter that processes a file stream and extracts text.
+
+    It identifies the file type based on its extension and dispatches to the
+    matching handler in `HANDLERS`. For ZIP archives, it recursively processes
+    the files within, writing every member into the same buffer.
+
+    Args:
+        file_name (str): The name of the file (e.g., 'document.docx').
+        file_stream (streamlit.UploadedFile or io.BytesIO): A byte stream of the file's content.
+        out (bytearray): Buffer the extracted text is appended to as UTF-8.
+            If the file cannot be processed, nothing is appended.
+        file_extension (str, optional): The lowercase extension of `file_name`,
+            if the caller has already computed it.
+        limits (_ExtractionLimits, optional): The zip-bomb guards shared by the
+            enclosing archives; a fresh set is used when omitted.
+    """
+    start = len(out)
+    try:
+        _convert(file_name, file_stream, out, file_extension, limits)
+    except Exception as e:
+        del out[start:]
+        message = f"An error occurred while processing '{file_name}': {e}"
+        if limits is not None and limits.errors is not None:
+            limits.errors.append(message)
+        else:
+            st.error(message)
+
+
+def convert_file(file_name, file_stream):
+    """
+    Converts a file stream to text in a single contiguous output buffer.
+
+    Args:
+        file_name (str): The name of the file (e.g., 'document.docx').
+        file_stream (streamlit.UploadedFile or io.BytesIO): A byte stream of the file's content.
+
+    Returns:
+        bytes: The extracted text content, encoded as UTF-8.
+    """
+    out = bytearray()
+    convert_file_to_text(file_name, file_stream, out)
+    return bytes(out)